@@ -36,3 +36,58 @@ def _build_postgres_url() -> str:
 
 
 DATABASE_URL = _build_postgres_url()
+
+
+def _int_env(name: str, default: int) -> int:
+    value = os.getenv(name)
+    if value is None or value == "":
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"{name} must be an integer")
+
+
+# Freshness policy for cached VIN decodes (based on Vin.decoded_at).
+# Vehicles whose model year is within VIN_RECENT_MODEL_YEARS of the current
+# year get the shorter TTL, since NHTSA still updates their records.
+VIN_RECENT_MODEL_YEARS = _int_env("VIN_RECENT_MODEL_YEARS", 2)
+VIN_TTL_RECENT_DAYS = _int_env("VIN_TTL_RECENT_DAYS", 7)
+VIN_TTL_DAYS = _int_env("VIN_TTL_DAYS", 180)
+
+# Background refresh limits and the off-peak sweeper schedule (UTC hour).
+VIN_REFRESH_MAX_IN_FLIGHT = _int_env("VIN_REFRESH_MAX_IN_FLIGHT", 4)
+if VIN_REFRESH_MAX_IN_FLIGHT < 1:
+    raise ValueError("VIN_REFRESH_MAX_IN_FLIGHT must be at least 1")
+VIN_SWEEP_HOUR_UTC = _int_env("VIN_SWEEP_HOUR_UTC", 3)
+if not 0 <= VIN_SWEEP_HOUR_UTC <= 23:
+    raise ValueError("VIN_SWEEP_HOUR_UTC must be between 0 and 23")
+VIN_SWEEP_BATCH_SIZE = _int_env("VIN_SWEEP_BATCH_SIZE", 50)
+if VIN_SWEEP_BATCH_SIZE < 1:
+    raise ValueError("VIN_SWEEP_BATCH_SIZE must be at least 1")
+
+
+def _float_env(name: str, default: float) -> float:
+    value = os.getenv(name)
+    if value is None or value == "":
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        raise ValueError(f"{name} must be a number")
+
+
+# Tracing: "" (off), "otlp" (collector at OTEL_EXPORTER_OTLP_ENDPOINT) or "file"
+TRACING_EXPORTER = os.getenv("TRACING_EXPORTER", "").lower()
+if TRACING_EXPORTER not in {"", "otlp", "file"}:
+    raise ValueError("TRACING_EXPORTER must be one of: otlp, file")
+TRACING_FILE = os.getenv("TRACING_FILE", "traces.jsonl")
+
+# Slow-request profiling (off unless PROFILING_ENABLED=1)
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "").lower() in {"1", "true", "yes"}
+PROFILING_THRESHOLD_MS = _float_env("PROFILING_THRESHOLD_MS", 500.0)
+PROFILING_SAMPLE_RATE = _float_env("PROFILING_SAMPLE_RATE", 0.01)
+if not 0.0 <= PROFILING_SAMPLE_RATE <= 1.0:
+    raise ValueError("PROFILING_SAMPLE_RATE must be between 0 and 1")
+PROFILING_INTERVAL_MS = _float_env("PROFILING_INTERVAL_MS", 1.0)
+PROFILING_MAX_PROFILES = _int_env("PROFILING_MAX_PROFILES", 20)
@@ -1,3 +1,4 @@
+import asyncio
 import base64
 from typing import Optional
 
@@ -7,13 +8,25 @@ from sqlalchemy import select
 from .vin_decoder import decode_vin
 from .db import Base, engine, get_session
 from .models import Vin, VinImage
-from .config import API_TOKEN
+from .config import API_TOKEN, PROFILING_ENABLED
 from .routers import vin as vin_router
+from .routers import admin as admin_router
+from .refresh import run_sweeper
+from .tracing import TracingMiddleware, setup_tracing
+from .profiling import SlowRequestProfiler
 
 
 app = FastAPI(title="VIN Decoder API")
 
 app.include_router(vin_router.router)
+app.include_router(admin_router.router)
+
+# Middleware is only installed when enabled so the default path has no overhead.
+# The profiler is added first so tracing wraps it and its own cost stays visible.
+if PROFILING_ENABLED:
+    app.add_middleware(SlowRequestProfiler)
+if setup_tracing(engine):
+    app.add_middleware(TracingMiddleware)
 
 
 # Mapping of sample VINs to base64-encoded image bytes (used to seed DB)
@@ -51,4 +64,20 @@ def startup() -> None:
                     content_type="image/png",
                     data=base64.b64decode(SAMPLE_PNG_BASE64),
                 )
-            )
\ No newline at end of file
+            )
+
+
+_sweeper_task: Optional[asyncio.Task] = None
+
+
+@app.on_event("startup")
+async def start_refresh_sweeper() -> None:
+    # Proactively refresh hot stale VINs during off-peak hours
+    global _sweeper_task
+    _sweeper_task = asyncio.create_task(run_sweeper())
+
+
+@app.on_event("shutdown")
+async def stop_refresh_sweeper() -> None:
+    if _sweeper_task:
+        _sweeper_task.cancel()
@@ -1,13 +1,28 @@
 import httpx
 from typing import Dict, List
 
+from .tracing import span
+
 NHTSA_API_BASE_URL = "https://vpic.nhtsa.dot.gov/api/vehicles"
 
 async def decode_vin_nhtsa(vin: str) -> List[Dict]:
     """Decodes a VIN using the NHTSA API and returns the raw results."""
     url = f"{NHTSA_API_BASE_URL}/decodevin/{vin}?format=json"
-    async with httpx.AsyncClient() as client:
-        response = await client.get(url)
-        response.raise_for_status()  # Raise an exception for HTTP errors
-        data = response.json()
-        return data.get("Results", [])
+    with span("nhtsa.decode_vin", vin=vin, **{"http.url": url}):
+        async with httpx.AsyncClient() as client:
+            response = await client.get(url)
+            response.raise_for_status()  # Raise an exception for HTTP errors
+            data = response.json()
+            return data.get("Results", [])
+
+
+def vin_fields_from_nhtsa(results: List[Dict]) -> Dict:
+    """Extract the columns stored on `Vin` from raw NHTSA results."""
+    make = next((item["Value"] for item in results if item["Variable"] == "Make"), None)
+    model = next((item["Value"] for item in results if item["Variable"] == "Model"), None)
+    model_year = next(
+        (int(item["Value"]) for item in results if item["Variable"] == "Model Year" and (item["Value"] or "").isdigit()),
+        None,
+    )
+    plant_city = next((item["Value"] for item in results if item["Variable"] == "Plant City"), None)
+    return {"make": make, "model": model, "model_year": model_year, "plant": plant_city}
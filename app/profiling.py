@@ -0,0 +1,91 @@
+"""Opt-in sampling profiler for slow requests.
+
+When PROFILING_ENABLED is set, a sample of requests (PROFILING_SAMPLE_RATE)
+runs under pyinstrument. Profiles of requests slower than
+PROFILING_THRESHOLD_MS are kept in memory (most recent PROFILING_MAX_PROFILES)
+and served by the admin endpoints.
+"""
+
+import random
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from .config import (
+    PROFILING_INTERVAL_MS,
+    PROFILING_MAX_PROFILES,
+    PROFILING_SAMPLE_RATE,
+    PROFILING_THRESHOLD_MS,
+)
+
+
+# profile id -> captured profile, oldest first
+_profiles: "OrderedDict[str, Dict]" = OrderedDict()
+
+
+def list_profiles() -> List[Dict]:
+    """Return metadata for captured profiles, newest first."""
+    # Admin handlers run in the threadpool while the middleware stores profiles
+    # on the event loop, so snapshot the values before iterating
+    snapshot = list(_profiles.values())
+    return [
+        {k: v for k, v in p.items() if k != "session"}
+        for p in reversed(snapshot)
+    ]
+
+
+def get_profile(profile_id: str) -> Optional[Dict]:
+    return _profiles.get(profile_id)
+
+
+def render_profile(profile: Dict, fmt: str = "html") -> str:
+    """Render a captured profile as pyinstrument HTML or speedscope JSON."""
+    from pyinstrument.renderers import HTMLRenderer, SpeedscopeRenderer
+
+    renderer = SpeedscopeRenderer() if fmt == "speedscope" else HTMLRenderer()
+    return renderer.render(profile["session"])
+
+
+def _store(method: str, path: str, duration_ms: float, session) -> None:
+    profile_id = uuid.uuid4().hex
+    _profiles[profile_id] = {
+        "id": profile_id,
+        "method": method,
+        "path": path,
+        "duration_ms": round(duration_ms, 1),
+        "captured_at": datetime.now(timezone.utc).isoformat(),
+        "session": session,
+    }
+    while len(_profiles) > PROFILING_MAX_PROFILES:
+        _profiles.popitem(last=False)
+
+
+class SlowRequestProfiler:
+    """ASGI middleware profiling sampled requests and keeping the slow ones.
+
+    Runs in the request's own task so pyinstrument's async mode attributes
+    awaited time (DB, NHTSA) to the right frames.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or random.random() >= PROFILING_SAMPLE_RATE:
+            await self.app(scope, receive, send)
+            return
+
+        from pyinstrument import Profiler
+
+        profiler = Profiler(interval=PROFILING_INTERVAL_MS / 1000, async_mode="enabled")
+        start = time.perf_counter()
+        profiler.start()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            profiler.stop()
+            duration_ms = (time.perf_counter() - start) * 1000
+            if duration_ms >= PROFILING_THRESHOLD_MS:
+                _store(scope["method"], scope["path"], duration_ms, profiler.last_session)
@@ -0,0 +1,199 @@
+"""Stale-while-revalidate refresh of cached VIN decodes.
+
+Cached rows in `vins` are always served immediately. When a row is older than
+its freshness TTL (see `is_stale`), a background task re-fetches it from NHTSA
+and upserts the result. A daily sweeper also refreshes the most requested stale
+VINs during off-peak hours.
+"""
+
+import asyncio
+import logging
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Set
+
+from sqlalchemy import and_, func, or_, select
+
+from .config import (
+    VIN_RECENT_MODEL_YEARS,
+    VIN_REFRESH_MAX_IN_FLIGHT,
+    VIN_SWEEP_BATCH_SIZE,
+    VIN_SWEEP_HOUR_UTC,
+    VIN_TTL_DAYS,
+    VIN_TTL_RECENT_DAYS,
+)
+from .db import get_session
+from .models import Vin, NHTSADecodedData
+from .nhtsa_api import decode_vin_nhtsa, vin_fields_from_nhtsa
+from .tracing import root_span
+
+
+logger = logging.getLogger(__name__)
+
+# Cache hits per VIN since the last sweep, used to pick the hottest stale VINs
+_hits: Counter = Counter()
+# Upper bound on distinct VINs tracked in `_hits` between sweeps
+_MAX_TRACKED_HITS = 10_000
+# How many hot VINs to consider per sweep slot (most hot VINs are still fresh)
+_SWEEP_CANDIDATE_FACTOR = 4
+# VINs with a refresh currently scheduled or running
+_in_flight: Set[str] = set()
+# Strong references to background tasks so they are not garbage collected
+_tasks: Set[asyncio.Task] = set()
+_semaphore = asyncio.Semaphore(VIN_REFRESH_MAX_IN_FLIGHT)
+
+
+def ttl_for(model_year: Optional[int], now: Optional[datetime] = None) -> timedelta:
+    """Return the freshness TTL for a VIN of the given model year.
+
+    Recent (or unknown) model years get the short TTL because NHTSA still
+    amends their records; older vehicles use the long TTL.
+    """
+    now = now or datetime.now(timezone.utc)
+    if model_year is None or now.year - model_year <= VIN_RECENT_MODEL_YEARS:
+        return timedelta(days=VIN_TTL_RECENT_DAYS)
+    return timedelta(days=VIN_TTL_DAYS)
+
+
+def is_stale(obj: Vin, now: Optional[datetime] = None) -> bool:
+    """Return True if the cached decode for `obj` is past its TTL."""
+    now = now or datetime.now(timezone.utc)
+    decoded_at = obj.decoded_at
+    if decoded_at is None:
+        return True
+    if decoded_at.tzinfo is None:
+        decoded_at = decoded_at.replace(tzinfo=timezone.utc)
+    return now - decoded_at > ttl_for(obj.model_year, now)
+
+
+def stale_clause(now: Optional[datetime] = None):
+    """SQL equivalent of `is_stale` for filtering `vins` rows."""
+    now = now or datetime.now(timezone.utc)
+    recent_since = now.year - VIN_RECENT_MODEL_YEARS
+    return or_(
+        and_(
+            or_(Vin.model_year.is_(None), Vin.model_year >= recent_since),
+            Vin.decoded_at < now - timedelta(days=VIN_TTL_RECENT_DAYS),
+        ),
+        and_(
+            Vin.model_year < recent_since,
+            Vin.decoded_at < now - timedelta(days=VIN_TTL_DAYS),
+        ),
+    )
+
+
+def record_hit(vin: str) -> None:
+    """Count a cache hit for `vin` so the sweeper can prioritise it."""
+    _hits[vin] += 1
+    if len(_hits) > _MAX_TRACKED_HITS:
+        # Keep the hottest half so memory stays bounded between sweeps
+        hottest = _hits.most_common(_MAX_TRACKED_HITS // 2)
+        _hits.clear()
+        _hits.update(dict(hottest))
+
+
+async def refresh_vin(vin: str) -> None:
+    """Re-fetch `vin` from NHTSA and upsert its cached row and NHTSA data."""
+    results = await decode_vin_nhtsa(vin)
+    if not results:
+        # Keep the existing data (still stale) rather than wiping it on an empty reply
+        logger.warning("NHTSA returned no results for VIN %s; keeping cached data", vin)
+        return
+    # The DB work is blocking (psycopg2), so keep it off the event loop
+    await asyncio.to_thread(_upsert_vin, vin, results)
+
+
+def _upsert_vin(vin: str, results: List[Dict]) -> None:
+    fields = vin_fields_from_nhtsa(results)
+    with get_session() as session:
+        obj = session.get(Vin, vin)
+        if not obj:
+            # Row was removed while the refresh was running; nothing to update
+            return
+        # `plant` holds the single VIN plant code, so only NHTSA-owned fields are refreshed
+        for key in ("make", "model", "model_year"):
+            if fields[key] is not None:
+                setattr(obj, key, fields[key])
+        # delete-orphan cascade drops the previous NHTSA rows
+        obj.nhtsa_data = [
+            NHTSADecodedData(
+                vin=vin,
+                variable=item["Variable"],
+                value=item["Value"],
+                variable_id=item["VariableId"],
+                value_id=item["ValueId"],
+            )
+            for item in results
+        ]
+        obj.decoded_at = func.now()
+
+
+async def _run_refresh(vin: str) -> None:
+    try:
+        async with _semaphore:
+            with root_span("vin.background_refresh", vin=vin):
+                await refresh_vin(vin)
+    except Exception:
+        logger.exception("Background refresh failed for VIN %s", vin)
+    finally:
+        _in_flight.discard(vin)
+
+
+def schedule_refresh(vin: str) -> bool:
+    """Start a background refresh for `vin` unless one is already running.
+
+    Returns False without scheduling if the VIN is already being refreshed or
+    the in-flight cap is reached; the stale row is retried on a later hit.
+    """
+    if vin in _in_flight or len(_in_flight) >= VIN_REFRESH_MAX_IN_FLIGHT:
+        return False
+    _in_flight.add(vin)
+    task = asyncio.create_task(_run_refresh(vin))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    return True
+
+
+def _hot_stale_vins(limit: int) -> List[str]:
+    """Return up to `limit` stale VINs, most requested first."""
+    hot = [vin for vin, _ in _hits.most_common(limit * _SWEEP_CANDIDATE_FACTOR)]
+    if not hot:
+        return []
+    with get_session() as session:
+        stale = set(
+            session.execute(select(Vin.vin).where(Vin.vin.in_(hot), stale_clause())).scalars().all()
+        )
+    return [vin for vin in hot if vin in stale][:limit]
+
+
+async def sweep_stale(limit: int = VIN_SWEEP_BATCH_SIZE) -> Dict[str, int]:
+    """Refresh the hottest stale VINs, respecting the in-flight cap."""
+    vins = _hot_stale_vins(limit)
+    _hits.clear()
+    refreshed = 0
+    for vin in vins:
+        if vin in _in_flight:
+            continue
+        _in_flight.add(vin)
+        await _run_refresh(vin)
+        refreshed += 1
+    return {"candidates": len(vins), "refreshed": refreshed}
+
+
+def _seconds_until_sweep(now: Optional[datetime] = None) -> float:
+    now = now or datetime.now(timezone.utc)
+    target = now.replace(hour=VIN_SWEEP_HOUR_UTC, minute=0, second=0, microsecond=0)
+    if target <= now:
+        target += timedelta(days=1)
+    return (target - now).total_seconds()
+
+
+async def run_sweeper() -> None:
+    """Run `sweep_stale` once a day at VIN_SWEEP_HOUR_UTC until cancelled."""
+    while True:
+        await asyncio.sleep(_seconds_until_sweep())
+        try:
+            result = await sweep_stale()
+            logger.info("VIN refresh sweep: %s", result)
+        except Exception:
+            logger.exception("VIN refresh sweep failed")
@@ -0,0 +1,33 @@
+from typing import List
+
+from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import HTMLResponse, Response
+
+from ..auth import verify_auth
+from ..config import PROFILING_ENABLED
+from ..profiling import get_profile, list_profiles, render_profile
+
+router = APIRouter(prefix="/admin", dependencies=[Depends(verify_auth)])
+
+
+@router.get("/profiles", response_model=List[dict])
+def profiles():
+    """Return metadata for captured slow-request profiles, newest first."""
+    if not PROFILING_ENABLED:
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+    return list_profiles()
+
+
+@router.get("/profiles/{profile_id}")
+def profile(profile_id: str, format: str = "html"):
+    """Return a captured profile as an HTML flame graph or speedscope JSON."""
+    if not PROFILING_ENABLED:
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+    if format not in {"html", "speedscope"}:
+        raise HTTPException(status_code=400, detail="format must be html or speedscope")
+    captured = get_profile(profile_id)
+    if not captured:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if format == "speedscope":
+        return Response(content=render_profile(captured, "speedscope"), media_type="application/json")
+    return HTMLResponse(content=render_profile(captured))
@@ -1,52 +1,70 @@
 from typing import Optional, List
 import base64
 
+import httpx
 from fastapi import APIRouter, HTTPException, UploadFile, File, Depends
-from fastapi.responses import Response
+from fastapi.responses import JSONResponse, Response
 from sqlalchemy import select
 
 from ..vin_decoder import decode_vin, get_make_from_wmi
 from ..db import get_session
 from ..models import Vin, VinImage, NHTSADecodedData
 from ..auth import verify_auth
-from ..nhtsa_api import decode_vin_nhtsa
+from ..nhtsa_api import decode_vin_nhtsa, vin_fields_from_nhtsa
+from ..refresh import is_stale, record_hit, schedule_refresh
+from ..tracing import span
 
 router = APIRouter(dependencies=[Depends(verify_auth)])
 
+def _vin_response(obj: Vin) -> JSONResponse:
+    """Build the decode response for a Vin and its associated NHTSA data."""
+    with span("vin.load_nhtsa_data", vin=obj.vin):
+        nhtsa_rows = list(obj.nhtsa_data)
+    with span("vin.serialize", vin=obj.vin):
+        nhtsa_data_list = [
+            {"variable": d.variable, "value": d.value, "variable_id": d.variable_id, "value_id": d.value_id}
+            for d in nhtsa_rows
+        ]
+        return JSONResponse(
+            content={
+                "vin": obj.vin,
+                "wmi": obj.wmi,
+                "vds": obj.vds,
+                "vis": obj.vis,
+                "model_year": obj.model_year,
+                "plant": obj.plant,
+                "valid_check_digit": obj.valid_check_digit,
+                "make": obj.make,
+                "model": obj.model,
+                "nhtsa_data": nhtsa_data_list,
+            }
+        )
+
+
 @router.get("/decode/{vin}")
 async def decode(vin: str):
-    """Return decoded data for a VIN, cached in DB."""
+    """Return decoded data for a VIN, cached in DB.
+
+    Stale cache entries are still returned immediately; a background refresh
+    re-fetches them from NHTSA.
+    """
     vin = vin.upper()
     try:
         with get_session() as session:
-            obj = session.get(Vin, vin)
+            with span("vin.cache_lookup", vin=vin):
+                obj = session.get(Vin, vin)
             if obj:
+                record_hit(vin)
+                if is_stale(obj):
+                    schedule_refresh(vin)
                 # If VIN exists, return its data and associated NHTSA data
-                nhtsa_data_list = [
-                    {"variable": d.variable, "value": d.value, "variable_id": d.variable_id, "value_id": d.value_id}
-                    for d in obj.nhtsa_data
-                ]
-                return {
-                    "vin": obj.vin,
-                    "wmi": obj.wmi,
-                    "vds": obj.vds,
-                    "vis": obj.vis,
-                    "model_year": obj.model_year,
-                    "plant": obj.plant,
-                    "valid_check_digit": obj.valid_check_digit,
-                    "make": obj.make,
-                    "model": obj.model,
-                    "nhtsa_data": nhtsa_data_list,
-                }
+                return _vin_response(obj)
 
             # If VIN not found, decode using NHTSA API
             nhtsa_results = await decode_vin_nhtsa(vin)
 
             # Extract common fields from NHTSA results
-            make = next((item["Value"] for item in nhtsa_results if item["Variable"] == "Make"), None)
-            model = next((item["Value"] for item in nhtsa_results if item["Variable"] == "Model"), None)
-            model_year = next((int(item["Value"]) for item in nhtsa_results if item["Variable"] == "Model Year" and item["Value"].isdigit()), None)
-            plant_city = next((item["Value"] for item in nhtsa_results if item["Variable"] == "Plant City"), None)
+            fields = vin_fields_from_nhtsa(nhtsa_results)
 
             # Create new Vin object
             obj = Vin(
@@ -54,11 +72,11 @@ async def decode(vin: str):
                 wmi=vin[0:3],
                 vds=vin[3:9],
                 vis=vin[9:],
-                model_year=model_year,
-                plant=plant_city, # Using plant_city for plant for now
+                model_year=fields["model_year"],
+                plant=fields["plant"], # Using plant_city for plant for now
                 valid_check_digit=None, # NHTSA API doesn't directly provide this as a boolean
-                make=make,
-                model=model,
+                make=fields["make"],
+                model=fields["model"],
             )
             session.add(obj)
 
@@ -72,26 +90,13 @@ async def decode(vin: str):
                     value_id=item["ValueId"],
                 )
                 session.add(nhtsa_data_entry)
-            session.commit()
-            session.refresh(obj)
+            with span("vin.commit", vin=vin):
+                session.commit()
+            with span("vin.refresh", vin=vin):
+                session.refresh(obj)
 
             # Return the newly created Vin data and NHTSA data
-            nhtsa_data_list = [
-                {"variable": d.variable, "value": d.value, "variable_id": d.variable_id, "value_id": d.value_id}
-                for d in obj.nhtsa_data
-            ]
-            return {
-                "vin": obj.vin,
-                "wmi": obj.wmi,
-                "vds": obj.vds,
-                "vis": obj.vis,
-                "model_year": obj.model_year,
-                "plant": obj.plant,
-                "valid_check_digit": obj.valid_check_digit,
-                "make": obj.make,
-                "model": obj.model,
-                "nhtsa_data": nhtsa_data_list,
-            }
+            return _vin_response(obj)
 
     except ValueError as exc:
         raise HTTPException(status_code=400, detail=str(exc))
@@ -129,21 +134,18 @@ async def upload_image(vin: str, file: UploadFile = File(...)):
         if not vin_obj:
             # Decode using NHTSA API if VIN not found
             nhtsa_results = await decode_vin_nhtsa(vin)
-            make = next((item["Value"] for item in nhtsa_results if item["Variable"] == "Make"), None)
-            model = next((item["Value"] for item in nhtsa_results if item["Variable"] == "Model"), None)
-            model_year = next((int(item["Value"]) for item in nhtsa_results if item["Variable"] == "Model Year" and item["Value"].isdigit()), None)
-            plant_city = next((item["Value"] for item in nhtsa_results if item["Variable"] == "Plant City"), None)
+            fields = vin_fields_from_nhtsa(nhtsa_results)
 
             vin_obj = Vin(
                 vin=vin,
                 wmi=vin[0:3],
                 vds=vin[3:9],
                 vis=vin[9:],
-                model_year=model_year,
-                plant=plant_city,
+                model_year=fields["model_year"],
+                plant=fields["plant"],
                 valid_check_digit=None,
-                make=make,
-                model=model,
+                make=fields["make"],
+                model=fields["model"],
             )
             session.add(vin_obj)
 
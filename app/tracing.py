@@ -0,0 +1,132 @@
+"""OpenTelemetry tracing for requests, NHTSA calls and SQL execution.
+
+Tracing is off unless TRACING_EXPORTER is set. While off, `span()` returns a
+shared no-op context manager and no middleware or SQLAlchemy listeners are
+installed, so instrumented code pays almost nothing.
+"""
+
+from contextlib import nullcontext
+from typing import Any, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .config import TRACING_EXPORTER, TRACING_FILE
+
+
+_NOOP = nullcontext()
+_tracer: Optional[Any] = None
+
+
+def span(name: str, **attributes: Any):
+    """Return a context manager tracing `name` as a child of the current span."""
+    if _tracer is None:
+        return _NOOP
+    return _tracer.start_as_current_span(name, attributes=attributes or None)
+
+
+def root_span(name: str, **attributes: Any):
+    """Like `span`, but start a new trace linked to the current span.
+
+    Used for background work that outlives the request which triggered it, so
+    its time does not show up inside the request's trace.
+    """
+    if _tracer is None:
+        return _NOOP
+    from opentelemetry import context, trace
+
+    current = trace.get_current_span().get_span_context()
+    links = [trace.Link(current)] if current.is_valid else None
+    return _tracer.start_as_current_span(
+        name, context=context.Context(), links=links, attributes=attributes or None
+    )
+
+
+def _build_exporter():
+    if TRACING_EXPORTER == "otlp":
+        # Endpoint and headers come from the standard OTEL_EXPORTER_OTLP_* variables
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+
+        return OTLPSpanExporter()
+
+    from opentelemetry.sdk.trace.export import ConsoleSpanExporter
+
+    out = open(TRACING_FILE, "a", encoding="utf-8")
+    return ConsoleSpanExporter(out=out, formatter=lambda s: s.to_json(indent=None) + "\n")
+
+
+def setup_tracing(engine: Engine) -> bool:
+    """Configure the tracer provider and instrument `engine`.
+
+    Returns False (and leaves tracing disabled) when TRACING_EXPORTER is unset.
+    Sampling follows the standard OTEL_TRACES_SAMPLER/OTEL_TRACES_SAMPLER_ARG.
+    """
+    global _tracer
+    if not TRACING_EXPORTER:
+        return False
+    if _tracer is not None:
+        return True
+
+    from opentelemetry import trace
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor
+
+    provider = TracerProvider(resource=Resource.create({"service.name": "cde-api"}))
+    provider.add_span_processor(BatchSpanProcessor(_build_exporter()))
+    trace.set_tracer_provider(provider)
+    _tracer = trace.get_tracer(__name__)
+    _instrument_engine(engine)
+    return True
+
+
+def _instrument_engine(engine: Engine) -> None:
+    """Emit a `db.execute` span around every statement run on `engine`."""
+    from opentelemetry.trace import Status, StatusCode
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_execute(conn, cursor, statement, parameters, context, executemany):
+        if _tracer is None:
+            return
+        context._trace_span = _tracer.start_span(
+            "db.execute",
+            attributes={"db.system": engine.dialect.name, "db.statement": statement},
+        )
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_execute(conn, cursor, statement, parameters, context, executemany):
+        current = getattr(context, "_trace_span", None)
+        if current is not None:
+            current.end()
+            context._trace_span = None
+
+    @event.listens_for(engine, "handle_error")
+    def _on_error(exception_context):
+        context = exception_context.execution_context
+        current = getattr(context, "_trace_span", None) if context is not None else None
+        if current is not None:
+            current.record_exception(exception_context.original_exception)
+            current.set_status(Status(StatusCode.ERROR))
+            current.end()
+            context._trace_span = None
+
+
+class TracingMiddleware:
+    """ASGI middleware wrapping each HTTP request in an `http.request` span."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with span("http.request", **{"http.method": scope["method"], "http.target": scope["path"]}) as current:
+
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    current.set_attribute("http.status_code", message["status"])
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
@@ -32,3 +32,8 @@ def test_image_endpoint():
 def test_image_not_found():
     response = client.get("/decode/INVALIDVIN000000/image", headers=AUTH)
     assert response.status_code == 404
+
+
+def test_profiles_disabled_by_default():
+    response = client.get("/admin/profiles", headers=AUTH)
+    assert response.status_code == 404
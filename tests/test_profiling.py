@@ -0,0 +1,73 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import profiling
+from app.main import app
+from app.profiling import SlowRequestProfiler, list_profiles
+
+AUTH = {"Authorization": "Bearer devtoken"}
+
+
+async def slow_app(scope, receive, send):
+    await asyncio.sleep(0.01)
+    await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"text/plain")]})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+@pytest.fixture(autouse=True)
+def clean_profiles():
+    profiling._profiles.clear()
+    yield
+    profiling._profiles.clear()
+
+
+def test_slow_request_is_profiled(monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILING_THRESHOLD_MS", 0)
+    monkeypatch.setattr(profiling, "PROFILING_SAMPLE_RATE", 1.0)
+    monkeypatch.setattr("app.routers.admin.PROFILING_ENABLED", True)
+
+    response = TestClient(SlowRequestProfiler(slow_app)).get("/slow")
+    assert response.status_code == 200
+
+    (captured,) = list_profiles()
+    assert captured["method"] == "GET"
+    assert captured["path"] == "/slow"
+    assert "session" not in captured
+
+    client = TestClient(app)
+    html = client.get(f"/admin/profiles/{captured['id']}", headers=AUTH)
+    assert html.status_code == 200
+    assert html.headers["content-type"].startswith("text/html")
+
+    speedscope = client.get(f"/admin/profiles/{captured['id']}?format=speedscope", headers=AUTH)
+    assert speedscope.status_code == 200
+    assert "profiles" in speedscope.json()
+
+
+def test_fast_request_is_not_kept(monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILING_THRESHOLD_MS", 60_000)
+    monkeypatch.setattr(profiling, "PROFILING_SAMPLE_RATE", 1.0)
+
+    TestClient(SlowRequestProfiler(slow_app)).get("/slow")
+    assert list_profiles() == []
+
+
+def test_profile_detail_disabled():
+    response = TestClient(app).get("/admin/profiles/unknown", headers=AUTH)
+    assert response.status_code == 404
+
+
+def test_list_profiles_tolerates_concurrent_store():
+    class StoresOnRead(dict):
+        def items(self):
+            # Simulate the middleware storing a profile mid-listing
+            profiling._store("GET", "/other", 1.0, None)
+            return super().items()
+
+    profiling._profiles["first"] = StoresOnRead(id="first", path="/slow", session=None)
+
+    listed = list_profiles()
+    assert [p["id"] for p in listed] == ["first"]
+    assert len(profiling._profiles) == 2
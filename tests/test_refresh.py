@@ -0,0 +1,165 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import delete
+
+from app import refresh
+from app.main import app
+from app.db import Base, engine, get_session
+from app.models import Vin, NHTSADecodedData
+from app.refresh import is_stale, ttl_for
+from app.config import VIN_TTL_DAYS, VIN_TTL_RECENT_DAYS
+
+client = TestClient(app)
+AUTH = {"Authorization": "Bearer devtoken"}
+NOW = datetime(2026, 6, 1, tzinfo=timezone.utc)
+TEST_VINS = [f"TESTREFRESH00000{i}" for i in range(1, 5)]
+LONG_AGO = datetime.now(timezone.utc) - timedelta(days=VIN_TTL_DAYS + 30)
+
+NHTSA_RESULTS = [
+    {"Variable": "Make", "Value": "NEWMAKE", "VariableId": 26, "ValueId": "1"},
+    {"Variable": "Model", "Value": "NEWMODEL", "VariableId": 28, "ValueId": "2"},
+]
+
+
+@pytest.fixture(autouse=True)
+def clean_rows():
+    Base.metadata.create_all(bind=engine)
+    refresh._hits.clear()
+    yield
+    with get_session() as session:
+        session.execute(delete(Vin).where(Vin.vin.in_(TEST_VINS)))
+    refresh._hits.clear()
+
+
+def _add_vin(vin, decoded_at, model_year=2005):
+    with get_session() as session:
+        session.add(
+            Vin(
+                vin=vin,
+                wmi=vin[:3],
+                vds=vin[3:9],
+                vis=vin[9:],
+                model_year=model_year,
+                make="OLDMAKE",
+                decoded_at=decoded_at,
+                nhtsa_data=[NHTSADecodedData(vin=vin, variable="Make", value="OLDMAKE")],
+            )
+        )
+
+
+def test_ttl_depends_on_model_year():
+    assert ttl_for(2026, NOW) == timedelta(days=VIN_TTL_RECENT_DAYS)
+    assert ttl_for(None, NOW) == timedelta(days=VIN_TTL_RECENT_DAYS)
+    assert ttl_for(2005, NOW) == timedelta(days=VIN_TTL_DAYS)
+
+
+def test_is_stale():
+    fresh = Vin(vin="1M8GDM9AXKP042788", model_year=2005, decoded_at=NOW - timedelta(days=1))
+    old = Vin(vin="1M8GDM9AXKP042788", model_year=2005, decoded_at=NOW - timedelta(days=VIN_TTL_DAYS + 1))
+    recent = Vin(vin="1M8GDM9AXKP042788", model_year=2026, decoded_at=NOW - timedelta(days=VIN_TTL_RECENT_DAYS + 1))
+    assert not is_stale(fresh, NOW)
+    assert is_stale(old, NOW)
+    assert is_stale(recent, NOW)
+
+
+def test_stale_hit_served_and_refresh_scheduled(monkeypatch):
+    vin = TEST_VINS[0]
+    _add_vin(vin, LONG_AGO)
+    scheduled = []
+    monkeypatch.setattr("app.routers.vin.schedule_refresh", scheduled.append)
+
+    async def fail_nhtsa(vin):
+        raise AssertionError("stale hit must not call NHTSA inline")
+
+    monkeypatch.setattr("app.routers.vin.decode_vin_nhtsa", fail_nhtsa)
+
+    response = client.get(f"/decode/{vin}", headers=AUTH)
+    assert response.status_code == 200
+    assert response.json()["make"] == "OLDMAKE"
+    assert scheduled == [vin]
+
+
+def test_schedule_refresh_skips_duplicates_and_respects_cap(monkeypatch):
+    monkeypatch.setattr(refresh, "VIN_REFRESH_MAX_IN_FLIGHT", 2)
+    started = []
+
+    async def run():
+        release = asyncio.Event()
+
+        async def fake_refresh(vin):
+            started.append(vin)
+            await release.wait()
+
+        monkeypatch.setattr(refresh, "refresh_vin", fake_refresh)
+        assert refresh.schedule_refresh(TEST_VINS[0])
+        assert not refresh.schedule_refresh(TEST_VINS[0])
+        assert refresh.schedule_refresh(TEST_VINS[1])
+        assert not refresh.schedule_refresh(TEST_VINS[2])
+        await asyncio.sleep(0)
+        release.set()
+        await asyncio.gather(*refresh._tasks)
+
+    asyncio.run(run())
+    assert started == TEST_VINS[:2]
+    assert not refresh._in_flight
+
+
+def test_refresh_vin_replaces_nhtsa_data(monkeypatch):
+    vin = TEST_VINS[0]
+    _add_vin(vin, LONG_AGO)
+
+    async def fake_nhtsa(vin):
+        return NHTSA_RESULTS
+
+    monkeypatch.setattr(refresh, "decode_vin_nhtsa", fake_nhtsa)
+    asyncio.run(refresh.refresh_vin(vin))
+
+    with get_session() as session:
+        obj = session.get(Vin, vin)
+        assert obj.make == "NEWMAKE"
+        assert obj.model == "NEWMODEL"
+        assert obj.decoded_at > LONG_AGO
+        assert not is_stale(obj)
+        values = sorted(d.value for d in obj.nhtsa_data)
+    assert values == ["NEWMAKE", "NEWMODEL"]
+
+
+def test_refresh_vin_keeps_data_on_empty_results(monkeypatch):
+    vin = TEST_VINS[0]
+    _add_vin(vin, LONG_AGO)
+
+    async def empty_nhtsa(vin):
+        return []
+
+    monkeypatch.setattr(refresh, "decode_vin_nhtsa", empty_nhtsa)
+    asyncio.run(refresh.refresh_vin(vin))
+
+    with get_session() as session:
+        obj = session.get(Vin, vin)
+        assert is_stale(obj)
+        assert [d.value for d in obj.nhtsa_data] == ["OLDMAKE"]
+
+
+def test_sweep_stale_prefers_hottest(monkeypatch):
+    hot, warm, cold, fresh = TEST_VINS
+    for vin in (hot, warm, cold):
+        _add_vin(vin, LONG_AGO)
+    _add_vin(fresh, datetime.now(timezone.utc))
+    for vin, hits in ((fresh, 10), (hot, 5), (warm, 3), (cold, 1)):
+        for _ in range(hits):
+            refresh.record_hit(vin)
+
+    refreshed = []
+
+    async def fake_refresh(vin):
+        refreshed.append(vin)
+
+    monkeypatch.setattr(refresh, "refresh_vin", fake_refresh)
+    result = asyncio.run(refresh.sweep_stale(limit=2))
+
+    assert refreshed == [hot, warm]
+    assert result == {"candidates": 2, "refreshed": 2}
+    assert not refresh._hits
@@ -0,0 +1,114 @@
+import time
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+from sqlalchemy import delete
+
+from app import nhtsa_api, refresh, tracing
+from app.main import app
+from app.db import Base, engine, get_session
+from app.models import Vin
+
+AUTH = {"Authorization": "Bearer devtoken"}
+TEST_VIN = "TESTTRACING000001"
+STALE_VIN = "TESTTRACING000002"
+_real_async_client = httpx.AsyncClient
+
+
+def _nhtsa_handler(request):
+    return httpx.Response(
+        200,
+        json={"Results": [{"Variable": "Make", "Value": "ACME", "VariableId": 26, "ValueId": "1"}]},
+    )
+
+
+@pytest.fixture
+def exporter(monkeypatch):
+    Base.metadata.create_all(bind=engine)
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    monkeypatch.setattr(tracing, "_tracer", provider.get_tracer(__name__))
+    tracing._instrument_engine(engine)
+    monkeypatch.setattr(
+        nhtsa_api.httpx,
+        "AsyncClient",
+        lambda: _real_async_client(transport=httpx.MockTransport(_nhtsa_handler)),
+    )
+    yield exporter
+    monkeypatch.setattr(tracing, "_tracer", None)
+    with get_session() as session:
+        session.execute(delete(Vin).where(Vin.vin.in_([TEST_VIN, STALE_VIN])))
+
+
+def test_decode_emits_spans(exporter):
+    client = TestClient(tracing.TracingMiddleware(app))
+    response = client.get(f"/decode/{TEST_VIN}", headers=AUTH)
+    assert response.status_code == 200
+
+    spans = exporter.get_finished_spans()
+    by_name = {}
+    for s in spans:
+        by_name.setdefault(s.name, []).append(s)
+
+    (root,) = by_name["http.request"]
+    assert root.parent is None
+    assert root.attributes["http.status_code"] == 200
+    for name in (
+        "vin.cache_lookup",
+        "nhtsa.decode_vin",
+        "vin.commit",
+        "vin.refresh",
+        "vin.load_nhtsa_data",
+        "vin.serialize",
+    ):
+        (stage,) = by_name[name]
+        assert stage.parent.span_id == root.context.span_id
+
+    parents = {s.parent.span_id for s in by_name["db.execute"]}
+    assert by_name["vin.cache_lookup"][0].context.span_id in parents
+    assert by_name["vin.commit"][0].context.span_id in parents
+    assert all(s.context.trace_id == root.context.trace_id for s in spans)
+
+
+def test_background_refresh_is_not_in_request_trace(exporter):
+    with get_session() as session:
+        session.add(
+            Vin(
+                vin=STALE_VIN,
+                wmi=STALE_VIN[:3],
+                vds=STALE_VIN[3:9],
+                vis=STALE_VIN[9:],
+                model_year=2005,
+                decoded_at=datetime.now(timezone.utc) - timedelta(days=3650),
+            )
+        )
+
+    with TestClient(tracing.TracingMiddleware(app)) as client:
+        response = client.get(f"/decode/{STALE_VIN}", headers=AUTH)
+        assert response.status_code == 200
+        deadline = time.monotonic() + 5
+        while STALE_VIN in refresh._in_flight and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    spans = exporter.get_finished_spans()
+    roots = [s for s in spans if s.name == "http.request" and s.attributes["http.target"] == f"/decode/{STALE_VIN}"]
+    (root,) = roots
+    (background,) = [s for s in spans if s.name == "vin.background_refresh"]
+
+    assert background.parent is None
+    assert background.context.trace_id != root.context.trace_id
+    assert background.links[0].context.span_id == root.context.span_id
+
+    (nhtsa,) = [s for s in spans if s.name == "nhtsa.decode_vin"]
+    assert nhtsa.parent.span_id == background.context.span_id
+    assert all(
+        s.parent.span_id != root.context.span_id
+        for s in spans
+        if s.context.trace_id == background.context.trace_id and s.parent is not None
+    )